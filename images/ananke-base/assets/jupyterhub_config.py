@@ -1,8 +1,9 @@
 # Configuration file for jupyterhub.
 
-import fcntl
 import json
 import logging
+import os
+import sqlite3
 import subprocess
 from glob import glob
 
@@ -124,11 +125,38 @@ c.post_auth_hook_callbacks.append(log_lti_data)
 # user data base
 #-------------------------------------------------------------------------------
 
-c.user_data_path = '/opt/user_data.json'
-logging.info('Reading user data base ' + c.user_data_path)
-with open(c.user_data_path) as f:
-    user_data = json.load(f)
-logging.debug(str(len(user_data)) + ' users in data base')
+c.user_data_path = '/opt/user_data.sqlite'
+legacy_user_data_path = '/opt/user_data.json'
+
+# Columns of the users table and the LTI claims they are taken from.
+user_data_claims = (('first', 'given_name'), ('last', 'family_name'), ('email', 'email'))
+
+logging.info('Opening user data base ' + c.user_data_path)
+user_data = sqlite3.connect(c.user_data_path)
+os.chmod(c.user_data_path, 0o600)
+user_data.execute('PRAGMA journal_mode=WAL')
+user_data.execute('PRAGMA synchronous=NORMAL')
+with user_data:
+    user_data.execute('CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, first TEXT, last TEXT, email TEXT, lms_uid TEXT)')
+
+# Import users from the JSON data base used by former versions.
+if os.path.isfile(legacy_user_data_path) and user_data.execute('SELECT COUNT(*) FROM users').fetchone()[0] == 0:
+    logging.info('Importing legacy user data base ' + legacy_user_data_path)
+    try:
+        with open(legacy_user_data_path) as f:
+            legacy_user_data = json.load(f)
+        with user_data:
+            user_data.executemany(
+                'INSERT OR IGNORE INTO users (username, first, last, email, lms_uid) VALUES (?, ?, ?, ?, ?)',
+                [(username, data.get('first'), data.get('last'), data.get('email'), data.get('lms_uid')) for username, data in legacy_user_data.items()]
+            )
+    except (OSError, json.JSONDecodeError, AttributeError):
+        logging.error('Error while importing legacy user data base.')
+
+logging.debug(str(user_data.execute('SELECT COUNT(*) FROM users').fetchone()[0]) + ' users in data base')
+
+# Fold the write-ahead log into the data base file and truncate it (compaction), as the hub restarts regularly.
+user_data.execute('PRAGMA wal_checkpoint(TRUNCATE)')
 
 async def update_user_data(authenticator: LTI13Authenticator, handler: LTI13CallbackHandler, authentication: dict) -> False:
     """
@@ -155,33 +183,30 @@ async def update_user_data(authenticator: LTI13Authenticator, handler: LTI13Call
         The parameters `handler` and `authentication` have to be supplied, even though they are not accessed.
     """
     
+    auth_state = authentication.get('auth_state') or {}
+    if not auth_state: # no LTI data available (e.g. login via API token), nothing to update
+        return False
+
     username = authentication.get('name')
     logging.debug(f'Looking up user {username} in data base.')
     
-    data = user_data.get(username, {})
-    first = authentication.get('auth_state').get('given_name')
-    last = authentication.get('auth_state').get('family_name')
-    email = authentication.get('auth_state').get('email')
-    sub = authentication.get('auth_state').get('sub')
-    update = False
-    if first and data.get('first') != first:
-        data['first'] = first
-        update = True
-    if last and data.get('last') != last:
-        data['last'] = last
-        update = True
-    if email and data.get('email') != email:
-        data['email'] = email
-        update = True
-
-    if update or len(data) == 0: # len==0 is equivalent to new user without name/email info in LTI data
+    row = user_data.execute('SELECT first, last, email FROM users WHERE username = ?', (username,)).fetchone()
+    data = dict(zip(('first', 'last', 'email'), row)) if row else {}
+    changes = {
+        field: value
+        for field, value in ((field, auth_state.get(claim)) for field, claim in user_data_claims)
+        if value and data.get(field) != value
+    }
+
+    if changes or row is None: # row is None for new users (with or without name/email info in LTI data)
         logging.debug(f'User {username} is new or came in with new name/email. Updating user data base')
-        data['lms_uid'] = sub
-        user_data[username] = data
-        with open(c.user_data_path, 'w') as f:
-            fcntl.flock(f, fcntl.LOCK_EX)
-            json.dump(user_data, f)
-            fcntl.flock(f, fcntl.LOCK_UN)
+        data.update(changes)
+        with user_data:
+            user_data.execute(
+                'INSERT INTO users (username, first, last, email, lms_uid) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(username) DO UPDATE SET first = excluded.first, last = excluded.last, email = excluded.email, lms_uid = excluded.lms_uid',
+                (username, data.get('first'), data.get('last'), data.get('email'), auth_state.get('sub'))
+            )
 
     return False
 
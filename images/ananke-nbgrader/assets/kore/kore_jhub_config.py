@@ -1,7 +1,7 @@
 # Configuration for nbgrader and Kore.
 
 import asyncio
-import fcntl
+import copy
 import json
 import logging
 import os
@@ -16,8 +16,8 @@ from ltiauthenticator.lti13.handlers import LTI13CallbackHandler
 from nbgrader.api import Gradebook
 
 sys.path.append('/opt/kore')  # noqa
-from exceptions import AutogeneratedFileError
-from misc.utils import read_autogenerated_config, write_autogenerated_config, make_course_id, get_hub_base_url
+from exceptions import AutogeneratedFileError, ConfigFileError
+from misc.utils import read_autogenerated_config, write_autogenerated_config, write_file_atomically, make_course_id, get_hub_base_url, update_course_titles, index_by_name
 from models.config_loaders import KoreConfigLoader
 
 logging.basicConfig(
@@ -217,23 +217,16 @@ async def nbgrader_post_auth(authenticator: LTI13Authenticator, handler: LTI13Ca
         # Add the user to the instructor list and write altered database to file.
         instructors.append(username)
 
-        with open(file=instructors_database_path, mode='w') as instructors_database:
-            fcntl.flock(instructors_database, fcntl.LOCK_EX)
-            json.dump(instructors, instructors_database)
-            fcntl.flock(instructors_database, fcntl.LOCK_UN)
-
-            try:
-                run(['chmod', '600', instructors_database_path], check=True)
-            except CalledProcessError:
-                logging.error('Command cannot be executed!')
+        try:
+            write_file_atomically(path=instructors_database_path, content=json.dumps(instructors))
+        except OSError:
+            logging.error('Instructors data base cannot be written!')
 
     # Write the instructor's LTI data to file. These are read by Kore.
     if is_instructor:
         lti_file_path = f'/opt/kore/runtime/lti_{username}.json'
         try:
-            with open(lti_file_path, mode='w') as lti_file:
-                json.dump(auth_state, lti_file, ensure_ascii=False, indent=4)
-            run(['chmod', '600', lti_file_path], check=True)
+            write_file_atomically(path=lti_file_path, content=json.dumps(auth_state, ensure_ascii=False, indent=4))
         except (FileNotFoundError, PermissionError, OSError):
             logging.error('LTI file cannot be opened/altered.')
 
@@ -243,8 +236,12 @@ async def nbgrader_post_auth(authenticator: LTI13Authenticator, handler: LTI13Ca
     logging.debug(f'Course id: {course_id}.')
     logging.debug(f'Grader user: {grader_user}.')
 
+    # Paths of the grader user's home and course directory.
+    grader_home = f'/home/{grader_user}'
+    course_data_path = f'{grader_home}/course_data'
+
     # Check existence of grader user.
-    grader_exists = os.path.isdir(f'/home/{grader_user}')
+    grader_exists = os.path.isdir(grader_home)
 
     # Create grader user if necessary.
     if is_instructor and not grader_exists:
@@ -284,7 +281,7 @@ async def nbgrader_post_auth(authenticator: LTI13Authenticator, handler: LTI13Ca
         config_content = '\n'.join([
             'c = get_config()',
             '',
-            f'c.CourseDirectory.root = \'/home/{grader_user}/course_data\'',
+            f'c.CourseDirectory.root = \'{course_data_path}\'',
             f'c.CourseDirectory.course_id = \'{course_id}\'',
             '',
             'c.GenerateFeedback.preprocessors = [',
@@ -297,38 +294,34 @@ async def nbgrader_post_auth(authenticator: LTI13Authenticator, handler: LTI13Ca
             ']'
         ])
 
-        with open(f'/home/{grader_user}/.jupyter/nbgrader_config.py', 'w') as f:
+        with open(f'{grader_home}/.jupyter/nbgrader_config.py', 'w') as f:
             f.write(config_content)
 
         try:
-            run(['mkdir', f'/home/{grader_user}/course_data'], check=True)
-        except CalledProcessError:
-            logging.error('Command cannot be executed!')
+            os.makedirs(course_data_path, exist_ok=True)
+        except OSError:
+            logging.error('Course data directory cannot be created!')
 
         # Initialize SQLite database using Gradebook class from nbgrader.
-        with Gradebook(f'sqlite:////home/{grader_user}/course_data/gradebook.db'):
+        with Gradebook(f'sqlite:///{course_data_path}/gradebook.db'):
             pass
 
         # Change ownership and permissions.
         try:
-            run(['chown', '-R', f'{grader_user}:{grader_user}', f'/home/{grader_user}'], check=True)
-            run(['chmod', '-R', 'go-rwx', f'/home/{grader_user}'], check=True)
+            run(['chown', '-R', f'{grader_user}:{grader_user}', grader_home], check=True)
+            run(['chmod', '-R', 'go-rwx', grader_home], check=True)
         except CalledProcessError:
             logging.error('Command cannot be executed!')
 
     # Write general data of course (e.g. title, id, ...) to a JSON file.
-    info_file_path = f'/home/{grader_user}/course_data/info.json'
+    info_file_path = f'{course_data_path}/info.json'
     if is_instructor and not os.path.exists(info_file_path):
-        target_link_uri = auth_state['https://purl.imsglobal.org/spec/lti/claim/target_link_uri']
-        target_link_uri = '/'.join(target_link_uri.strip('/').split('://')[-1].split('/')[1:]) + '/'
-        target_link_uri = '' if target_link_uri == '/' else target_link_uri
-
         info = {
             'id': course_id,
             'title': course_title,
             'title_short': course_title_short,
             'grader_user': grader_user,
-            'target_link_uri': target_link_uri,
+            'target_link_uri': get_hub_base_url(auth_state),
             'aud': auth_state['aud'],
             'lineitem': auth_state['https://purl.imsglobal.org/spec/lti-ags/claim/endpoint']['lineitem']
         }
@@ -345,14 +338,12 @@ async def nbgrader_post_auth(authenticator: LTI13Authenticator, handler: LTI13Ca
     # Create grader service if necessary.
     if is_instructor:
 
-        # Read services, roles, groups from config file.
-        services, roles, groups = read_autogenerated_config(autogenerated_file_path=config_loader.autogenerated_file_path)
+        # Read services, roles, groups from config file. They are modified below, so the cached ones are copied.
+        services, roles, groups = copy.deepcopy(read_autogenerated_config(autogenerated_file_path=config_loader.autogenerated_file_path))
 
         # Check if formgrader service is present otherwise create it.
-        for service in services:
-            if service['name'] == course_id:
-                logging.debug('Course exists already.')
-                break
+        if course_id in index_by_name(services):
+            logging.debug('Course exists already.')
         else:
             logging.info(f'Creating new nbgrader course: {course_id}.')
 
@@ -365,17 +356,16 @@ async def nbgrader_post_auth(authenticator: LTI13Authenticator, handler: LTI13Ca
                 'url': f'http://127.0.0.1:{port}',
                 'command': ['jupyterhub-singleuser', f'--group=formgrade-{course_id}', '--KernelSpecManager.ensure_native_kernel=False'],  # '--debug'],
                 'user': grader_user,
-                'cwd': f'/home/{grader_user}',
+                'cwd': grader_home,
                 'api_token': secrets.token_hex(32),
                 'oauth_no_confirm': True,
                 'display': False
             })
 
             # Check if formgrader role exists otherwise create it.
-            for role in roles:
-                if role.get('name') == 'formgrader-service-role':
-                    role['services'].append(course_id)
-                    break
+            service_role = index_by_name(roles).get('formgrader-service-role')
+            if service_role:
+                service_role['services'].append(course_id)
             else:
                 roles.append({
                     'name': 'formgrader-service-role',
@@ -414,36 +404,15 @@ async def nbgrader_post_auth(authenticator: LTI13Authenticator, handler: LTI13Ca
     # Write course title to global nbgrader_config.py.
     if is_instructor:
         try:
-            with open(file=nbgrader_config_path, mode='r') as nbgrader_config_file:
-                content = nbgrader_config_file.read()
-        except (FileNotFoundError, PermissionError, OSError):
-            logging.error('Error while accessing nbgrader configuration file.')
-
-        start = content.find('c.NbGrader.course_titles')
-        end = content.find('}', start)
-        pre = content[:start]
-        code = content[start:end + 1]
-        post = content[end + 1:]
-        code = code.replace('c.NbGrader.course_titles = ', 'mapping.update(')
-        code = code.replace('}', '})')
-
-        mapping = {}
-        exec(code + '\n')
-        mapping[course_id] = course_title
-
-        try:
-            with open(file=nbgrader_config_path, mode='w') as nbgrader_config_file:
-                nbgrader_config_file.write(pre)
-                nbgrader_config_file.write(f'c.NbGrader.course_titles = {str(mapping)}')
-                nbgrader_config_file.write(post)
-        except (FileNotFoundError, PermissionError, OSError):
+            update_course_titles(nbgrader_config_path=nbgrader_config_path, course_id=course_id, course_title=course_title)
+        except ConfigFileError:
             logging.error('Error while accessing nbgrader configuration file.')
 
     # Add student to course.
     if grader_exists and not is_instructor:
 
         # Add student to nbgrader database.
-        with Gradebook(f'sqlite:////home/{grader_user}/course_data/gradebook.db') as gb:
+        with Gradebook(f'sqlite:///{course_data_path}/gradebook.db') as gb:
             gb.update_or_create_student(
                 username,
                 first_name=auth_state.get('given_name', 'none'),
@@ -460,7 +429,7 @@ async def nbgrader_post_auth(authenticator: LTI13Authenticator, handler: LTI13Ca
                         '-H', 'Accept: application/json',
                         '-H', f'Authorization: token {kore_token}',
                         '-X', 'POST',
-                        '-d', '{"users":["' + username + '"]}',
+                        '-d', json.dumps({'users': [username]}),
                         f'http://127.0.0.1:8081/{base_url}hub/api/groups/nbgrader-{course_id}/users'])
 
     return needs_restart
@@ -0,0 +1,53 @@
+# Used to finish the deletion of a course in the background. Started by Kore via `systemd-run` with a job file, e.g.
+# `python -m misc.delete_worker /opt/kore/runtime/jobs/delete_<course_id>.json` from `/opt/kore`.
+
+import json
+import logging
+import os
+import sys
+from subprocess import run, CalledProcessError
+
+from misc.utils import remove_tree
+
+logging.basicConfig(level=logging.INFO)
+
+job_path = sys.argv[1]
+
+# Stop JupyterHub while the course's data is deleted. This stops the course's formgrader service, which runs as the
+# grader user and would prevent its deletion, and keeps the hub's startup from recreating the grader user from its
+# home directory while the home directory is being removed.
+logging.info('Stopping JupyterHub...')
+run(['systemctl', 'stop', 'jupyterhub'])
+
+try:
+    # Read job.
+    with open(file=job_path, mode='r') as job_file:
+        job = json.load(job_file)
+    course_id = job['course_id']
+    grader_user = job['grader_user']
+
+    logging.info(f'Deleting data of course {course_id}.')
+
+    # Delete nbgrader exchange directory for course.
+    try:
+        remove_tree(f'/opt/nbgrader_exchange/{course_id}')
+    except OSError:
+        logging.error(f'Exchange directory of course {course_id} could not be deleted!')
+
+    # Delete grader user for course. The home directory is kept if the user cannot be deleted.
+    try:
+        run(['userdel', grader_user], check=True)
+        remove_tree(f'/home/{grader_user}')
+    except CalledProcessError:
+        logging.error(f'Grader user {grader_user} could not be deleted!')
+    except OSError:
+        logging.error(f'Home directory of grader user {grader_user} could not be deleted!')
+finally:
+    # Start JupyterHub again to adopt the changes, as the course is already removed from the configuration.
+    logging.info('Starting JupyterHub...')
+    run(['systemctl', 'start', 'jupyterhub'])
+
+    try:
+        os.remove(job_path)
+    except FileNotFoundError:
+        pass
@@ -1,20 +1,52 @@
-import fcntl
+import ast
+import functools
 import grp
 import hashlib
 import json
 import logging
 import os
+import pwd
+import shutil
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from subprocess import run, CalledProcessError
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 
+import requests
 from flask import Response
 from flask import request as flask_request
+from requests.exceptions import RequestException
 from werkzeug.exceptions import BadRequestKeyError
 
 from exceptions import AutogeneratedFileError, InfoFileError, CleanUpError, ConfigFileError, UniqueNamesError, ActivePathsError
 from models.enums import Subset, Content
-from nbgrader.api import Gradebook
+from nbgrader.api import Gradebook, Student
+
+try:
+    import orjson
+except ImportError:
+    # Fall back to the standard library, if the (faster) orjson package is not installed.
+    orjson = None
+
+# LTI 1.3 claims read from the LTI state.
+_LTI_CLAIM_DEPLOYMENT_ID = 'https://purl.imsglobal.org/spec/lti/claim/deployment_id'
+_LTI_CLAIM_RESOURCE_LINK = 'https://purl.imsglobal.org/spec/lti/claim/resource_link'
+_LTI_CLAIM_CONTEXT = 'https://purl.imsglobal.org/spec/lti/claim/context'
+_LTI_CLAIM_TARGET_LINK_URI = 'https://purl.imsglobal.org/spec/lti/claim/target_link_uri'
+
+# Parsed autogenerated configurations by file path. Each entry holds the `(path, st_ino, st_mtime_ns, st_size)` of the
+# parsed file (sidecar or configuration file) and the resulting services, roles and groups, so unchanged files are not
+# parsed again on every request.
+_AUTOGEN_CACHE: Dict[str, Tuple[Tuple[str, int, int, int], Tuple[list, list, dict]]] = {}
+
+# Session for requests to the local JupyterHub API. It keeps the connection to the hub alive between requests.
+hub_session = requests.Session()
+hub_session.headers.update({
+    'Content-Type': 'application/json',
+    'Accept': 'application/json',
+})
 
 
 def load_json(path: str) -> dict:
@@ -32,10 +64,71 @@ def load_json(path: str) -> dict:
         A dictionary containing the JSON data loaded from the file.
     """
 
+    # orjson parses the raw bytes directly, without decoding them to a string first.
+    if orjson is not None:
+        with open(file=path, mode='rb') as file:
+            return orjson.loads(file.read())
+
     with open(file=path, mode='r') as file:
         return json.load(file)
 
 
+def dump_json(data) -> bytes | str:
+    """
+    Serializes data to JSON, e.g. for response bodies. Uses orjson if available and the standard library otherwise.
+
+    Parameters
+    ----------
+    data
+        The data to be serialized.
+
+    Returns
+    -------
+    bytes | str
+        The JSON document as bytes (orjson) or string (standard library).
+    """
+
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data)
+
+
+def write_file_atomically(path: str, content: str, mode: int = 0o600) -> None:
+    """
+    Writes text to a file by writing a temporary file in the same directory and renaming it to the target path.
+    Readers therefore see either the old or the new content, but never a partially written file.
+
+    Parameters
+    ----------
+    path : str
+        The file path to be written.
+    content : str
+        The text to be written to the file.
+    mode : int, optional
+        The permissions of the written file. Default is 0o600.
+
+    Returns
+    -------
+    None
+    """
+
+    tmp_path = f'{path}.tmp.{os.getpid()}'
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        os.fchmod(fd, mode)
+        with open(fd, mode='w', encoding='utf-8') as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
 def load_config(path: str) -> dict:
     try:
         return load_json(path=path)
@@ -50,31 +143,177 @@ def load_info(path: str) -> dict:
         raise InfoFileError
 
 
+@functools.lru_cache(maxsize=128)
+def _load_json_by_stat(path: str, ino: int, mtime_ns: int, size: int) -> dict:
+    return load_json(path=path)
+
+
+def load_json_cached(path: str) -> dict:
+    """
+    Loads JSON data like `load_json`, but re-uses the parsed data as long as the file's inode, modification time and size
+    are unchanged.
+
+    Parameters
+    ----------
+    path : str
+        The file path to the JSON file to be loaded.
+
+    Returns
+    -------
+    dict
+        A dictionary containing the JSON data. The dictionary is shared between calls and must not be modified.
+    """
+
+    # Files are replaced atomically, so a rewrite within the same timestamp tick still changes the inode number.
+    stat = os.stat(path)
+    return _load_json_by_stat(path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def load_info_cached(path: str) -> dict:
+    """
+    Loads an info file like `load_info`, but re-uses the parsed data as long as the file is unchanged.
+
+    Parameters
+    ----------
+    path : str
+        The file path to the info file to be loaded.
+
+    Returns
+    -------
+    dict
+        A dictionary containing the info data. The dictionary is shared between calls and must not be modified.
+    """
+
+    try:
+        return load_json_cached(path=path)
+    except (FileNotFoundError, OSError, PermissionError):
+        raise InfoFileError
+
+
+@functools.lru_cache(maxsize=256)
+def get_user_ids(user_name: str) -> Tuple[int, int]:
+    """
+    Looks up the user ID and the primary group ID of a grader user. Lookups are cached for the lifetime of the process,
+    as they may be expensive (e.g. with LDAP backed user databases). Failed lookups are not cached.
+
+    Only grader users, which are created with `useradd` and keep their IDs, may be looked up this way. Hub users are
+    systemd dynamic users, whose IDs are allocated when their server starts and may be reused by other users. Deleting a
+    grader user restarts JupyterHub and with it Kore, which empties the cache.
+
+    Parameters
+    ----------
+    user_name : str
+        The name of the grader user.
+
+    Returns
+    -------
+    tuple[int, int]
+        The user ID and the group ID.
+
+    Raises
+    ------
+    KeyError
+        If the user does not exist.
+    """
+
+    user = pwd.getpwnam(user_name)
+    return user.pw_uid, user.pw_gid
+
+
+def remove_tree(path: str) -> None:
+    """
+    Recursively removes a directory like `rm -rf`, but in-process. A missing directory is not an error.
+
+    Parameters
+    ----------
+    path : str
+        The directory to be removed.
+
+    Returns
+    -------
+    None
+    """
+
+    try:
+        shutil.rmtree(path)
+    except FileNotFoundError:
+        pass
+
+
+def copy_tree(src: str, dst: str, uid: int, gid: int) -> None:
+    """
+    Recursively copies a directory and hands the copy over to the given user and group, like `cp -r` followed by
+    `chown -R`. Files are chowned right after being copied, so the file tree is not walked twice and no external
+    processes are spawned.
+
+    Parameters
+    ----------
+    src : str
+        The directory to be copied.
+    dst : str
+        The path of the copy. Must not exist yet.
+    uid : int
+        The user identifier (uid) of the copy.
+    gid : int
+        The group identifier (gid) of the copy.
+
+    Returns
+    -------
+    None
+    """
+
+    def copy_and_chown(src_file: str, dst_file: str) -> None:
+        shutil.copy2(src_file, dst_file)
+        os.chown(dst_file, uid, gid)
+
+    def chown_dirs_and_links(path: str) -> None:
+        os.chown(path, uid, gid)
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_symlink():
+                    os.chown(entry.path, uid, gid, follow_symlinks=False)
+                elif entry.is_dir():
+                    chown_dirs_and_links(entry.path)
+
+    shutil.copytree(src, dst, symlinks=True, copy_function=copy_and_chown)
+
+    # Directories and symbolic links are created by copytree itself, so their ownership is set afterwards.
+    chown_dirs_and_links(dst)
+
+
 def handle_clean_up(path: str, kore_token: str, base_url: str, course_id: str):
     try:
-        # Remove students from gradebook.
-        with Gradebook(f'sqlite:///{path}/gradebook.db') as gb:
-            usernames = [student.id for student in gb.students]
-            for username in usernames:
-                gb.remove_student(username)
+        # Collect the course's students. They are not removed one by one, as the whole gradebook is deleted below.
+        # Opening a missing gradebook would create a new database, so it is only opened if it exists.
+        gradebook_path = f'{path}/gradebook.db'
+        if os.path.isfile(gradebook_path):
+            with Gradebook(f'sqlite:///{gradebook_path}') as gb:
+                usernames = [student_id for student_id, in gb.db.query(Student.id)]
+        else:
+            usernames = []
 
         # Remove students from courses nbgrader group.
-        run(['systemd-run', 'curl',
-             '-H', 'Content-Type: application/json',
-             '-H', 'Accept: application/json',
-             '-H', f'Authorization: token {kore_token}',
-             '-X', 'DELETE',
-             '-d', '{"users":' + json.dumps(usernames) + '}',
-             f'http://127.0.0.1:8081/{base_url}hub/api/groups/nbgrader-{course_id}/users'], check=True)
-
-        # Clean up the nbgrader exchange directory.
-        run(['rm', '-rf', f'/opt/nbgrader_exchange/{course_id}/'], check=True)
+        if usernames:
+            response = hub_session.delete(
+                url=f'http://127.0.0.1:8081/{base_url}hub/api/groups/nbgrader-{course_id}/users',
+                headers={'Authorization': f'token {kore_token}'},
+                json={'users': usernames},
+                timeout=10
+            )
+            response.raise_for_status()
 
         # Clean up course directory.
-        run(['rm', f'{path}/gradebook.db'], check=True)
-        for directory in ['autograded', 'feedback', 'release', 'submitted']:
-            run(['rm', '-rf', f'{path}/{directory}/'], check=True)
-    except (FileNotFoundError, PermissionError, KeyError, CalledProcessError):
+        try:
+            os.remove(gradebook_path)
+        except FileNotFoundError:
+            pass
+
+        # Clean up the nbgrader exchange directory and the course's student data. The trees are independent, so they
+        # are removed concurrently.
+        targets = [f'/opt/nbgrader_exchange/{course_id}', *(f'{path}/{directory}' for directory in ['autograded', 'feedback', 'release', 'submitted'])]
+        with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+            list(executor.map(remove_tree, targets))
+    except (FileNotFoundError, PermissionError, OSError, KeyError, RequestException):
         raise CleanUpError
 
 
@@ -93,11 +332,14 @@ def make_course_id(lti_state: dict) -> Tuple[str, str, str, str]:
         The returned tuple contains the course id, course title and the grader user as strings.
     """
 
-    deployment_id = lti_state.get('https://purl.imsglobal.org/spec/lti/claim/deployment_id', '0')
-    resource_link_id = lti_state.get('https://purl.imsglobal.org/spec/lti/claim/resource_link').get('id')
-    resource_link_title = lti_state.get('https://purl.imsglobal.org/spec/lti/claim/resource_link').get('title')
-    context_title = lti_state.get('https://purl.imsglobal.org/spec/lti/claim/context', {}).get('title')
+    deployment_id = lti_state.get(_LTI_CLAIM_DEPLOYMENT_ID, '0')
+    resource_link = lti_state.get(_LTI_CLAIM_RESOURCE_LINK) or {}
+    resource_link_id = resource_link.get('id')
+    resource_link_title = resource_link.get('title')
+    context_title = (lti_state.get(_LTI_CLAIM_CONTEXT) or {}).get('title')
 
+    # Course ids (and grader users, home directories, services derived from them) have to be stable across versions,
+    # so the hash function must not be changed.
     h = hashlib.shake_256(f'{deployment_id}-{resource_link_id}'.encode())
     course_id = 'c-' + h.hexdigest(8)
     grader_user = course_id[0:32]
@@ -120,6 +362,80 @@ def read_autogenerated_config(autogenerated_file_path: str) -> Tuple[list, list,
     """
     Read services, roles and groups from the autogenerated configuration file.
 
+    The JSON sidecar written next to the configuration file is preferred. The Python code of the configuration file is
+    only executed if no sidecar is present (e.g. for configurations written by older versions of Kore).
+
+    Parameters
+    ----------
+    autogenerated_file_path : str
+        Path to the autogenerated configuration file.
+
+    Returns
+    -------
+    tuple[list, list, dict]
+         The returned tuple contains the services (list), the roles (list) and the groups (dict). They are shared
+         between calls and must not be modified; callers that change the configuration have to copy them first.
+    """
+
+    sidecar_path = f'{autogenerated_file_path}.json'
+
+    # Identify the file to read from by its path, inode, modification time and size. Files are replaced atomically, so a
+    # rewrite within the same timestamp tick still changes the inode number.
+    stat_key = None
+    for source_path in (sidecar_path, autogenerated_file_path):
+        try:
+            stat = os.stat(source_path)
+            stat_key = (source_path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            break
+        except OSError:
+            continue
+
+    # Return cached configuration if the file did not change since it was parsed last.
+    cached = _AUTOGEN_CACHE.get(autogenerated_file_path)
+    if stat_key is not None and cached is not None and cached[0] == stat_key:
+        logging.debug('Using cached autogenerated service configuration.')
+        return cached[1]
+
+    if stat_key is not None and stat_key[0] == sidecar_path:
+        try:
+            logging.debug('Reading autogenerated service configuration sidecar.')
+            config = load_json(path=sidecar_path)
+            services, roles, groups = config['services'], config['roles'], config['groups']
+        except (OSError, ValueError, KeyError):
+            logging.warning('Autogenerated service configuration sidecar not readable! Falling back to configuration file.')
+            services, roles, groups = exec_autogenerated_config(autogenerated_file_path=autogenerated_file_path)
+    else:
+        services, roles, groups = exec_autogenerated_config(autogenerated_file_path=autogenerated_file_path)
+
+    if stat_key is not None:
+        _AUTOGEN_CACHE[autogenerated_file_path] = (stat_key, (services, roles, groups))
+
+    return services, roles, groups
+
+
+def index_by_name(items: list) -> Dict[str, dict]:
+    """
+    Index services or roles of the autogenerated configuration by their name. The order of the items is kept, so
+    `list(index.values())` restores the list.
+
+    Parameters
+    ----------
+    items : list
+        A list of services or roles (dicts with a `name` key).
+
+    Returns
+    -------
+    dict[str, dict]
+        A dict mapping each name to its service or role.
+    """
+
+    return {item['name']: item for item in items}
+
+
+def exec_autogenerated_config(autogenerated_file_path: str) -> Tuple[list, list, dict]:
+    """
+    Read services, roles and groups by executing the Python code of the autogenerated configuration file.
+
     Parameters
     ----------
     autogenerated_file_path : str
@@ -168,6 +484,7 @@ def read_autogenerated_config(autogenerated_file_path: str) -> Tuple[list, list,
 def write_autogenerated_config(autogenerated_file_path: str, services: list, roles: list, groups: dict) -> None:
     """
     Write services, roles and groups to a Python file. Which is read and used by the JupyterHub after next restart.
+    The same data is written to a JSON sidecar (`<autogenerated_file_path>.json`), which is read by Kore.
 
     Parameters
     ----------
@@ -189,6 +506,7 @@ def write_autogenerated_config(autogenerated_file_path: str, services: list, rol
     """
 
     logging.debug('Writing autogenerated service configuration.')
+    _AUTOGEN_CACHE.pop(autogenerated_file_path, None)
 
     # Compose code to be written.
     config_code = '# Autogenerated nbgrader course configuration (DO NOT MODIFY)\n\n'
@@ -207,18 +525,93 @@ def write_autogenerated_config(autogenerated_file_path: str, services: list, rol
     config_code += '# Groups\n'
     config_code += 'c.JupyterHub.load_groups.update(' + str(groups) + ')\n'
 
-    # Write code to file.
+    # Write sidecar and code to file. The sidecar is read by Kore instead of the code, so it is written first. Otherwise
+    # a failed sidecar write would leave a stale sidecar, and the next write based on it would drop the new entries.
     try:
-        with open(file=autogenerated_file_path, mode='w') as autogenerated_file:
-            fcntl.flock(autogenerated_file, fcntl.LOCK_EX)
-            autogenerated_file.write(config_code)
-            fcntl.flock(autogenerated_file, fcntl.LOCK_UN)
-        run(['chmod', '600', autogenerated_file_path], check=True)
-    except CalledProcessError:
-        logging.error('Command cannot be executed!')
-        raise AutogeneratedFileError
+        write_file_atomically(path=f'{autogenerated_file_path}.json', content=json.dumps({'services': services, 'roles': roles, 'groups': groups}))
+        write_file_atomically(path=autogenerated_file_path, content=config_code)
     except PermissionError:
         logging.debug('Autogenerated services files not readable!')
+    except OSError:
+        logging.error('Autogenerated services files cannot be written!')
+        raise AutogeneratedFileError
+
+
+def update_course_titles(nbgrader_config_path: str, course_id: str, course_title: Optional[str] = None) -> None:
+    """
+    Add, update or remove a course in the course ID to course title mapping (`c.NbGrader.course_titles`). The mapping
+    is stored in `course_titles.json` next to the global nbgrader configuration file, which loads it from there.
+
+    Parameters
+    ----------
+    nbgrader_config_path : str
+        Path to the global nbgrader configuration file.
+    course_id : str
+        The ID of the course.
+    course_title : Optional[str], optional
+        The title of the course. If None, the course is removed from the mapping. Default is None.
+
+    Returns
+    -------
+    None
+    """
+
+    course_titles_path = os.path.join(os.path.dirname(nbgrader_config_path), 'course_titles.json')
+
+    try:
+        mapping = load_json(path=course_titles_path)
+    except FileNotFoundError:
+        # Migrate mapping written to the configuration file by older versions of Kore.
+        mapping = _read_course_titles_from_config(nbgrader_config_path=nbgrader_config_path)
+    except (PermissionError, OSError, ValueError):
+        raise ConfigFileError
+
+    if course_title is None:
+        mapping.pop(course_id, None)
+    else:
+        mapping[course_id] = course_title
+
+    # The mapping has to be readable by all users running nbgrader.
+    try:
+        write_file_atomically(path=course_titles_path, content=json.dumps(mapping), mode=0o644)
+    except OSError:
+        raise ConfigFileError
+
+
+def _read_course_titles_from_config(nbgrader_config_path: str) -> dict:
+    """
+    Read the course ID to course title mapping from an assignment `c.NbGrader.course_titles = {...}` in the global
+    nbgrader configuration file. The assignment is located with the `ast` module and evaluated with
+    `ast.literal_eval`, so no code of the configuration file is executed.
+
+    Parameters
+    ----------
+    nbgrader_config_path : str
+        Path to the global nbgrader configuration file.
+
+    Returns
+    -------
+    dict
+        The mapping, or an empty dict if the configuration file does not contain one.
+    """
+
+    try:
+        with open(file=nbgrader_config_path, mode='r', encoding='utf-8') as nbgrader_config_file:
+            content = nbgrader_config_file.read()
+    except FileNotFoundError:
+        return {}
+    except (PermissionError, OSError):
+        raise ConfigFileError
+
+    try:
+        for node in ast.parse(content).body:
+            if isinstance(node, ast.Assign) and [ast.unparse(target) for target in node.targets] == ['c.NbGrader.course_titles']:
+                mapping = ast.literal_eval(node.value)
+                return mapping if isinstance(mapping, dict) else {}
+    except (SyntaxError, ValueError):
+        raise ConfigFileError
+
+    return {}
 
 
 def get_hub_base_url(lti_state: dict) -> str:
@@ -236,15 +629,116 @@ def get_hub_base_url(lti_state: dict) -> str:
         The base url of the JupyterHub as string.
     """
 
-    base_url = lti_state['https://purl.imsglobal.org/spec/lti/claim/target_link_uri']
-    base_url = '/'.join(base_url.strip('/').split('://')[-1].split('/')[1:]) + '/'
+    base_path = urlsplit(lti_state[_LTI_CLAIM_TARGET_LINK_URI]).path.strip('/')
+    base_url = f'{base_path}/' if base_path else ''
     logging.debug(f'Base url of JupyterHub as retrieved from the LTI state file: {base_url}.')
 
-    base_url = '' if base_url == '/' else base_url
-
     return base_url
 
 
+def find_notebooks(path: str) -> List[str]:
+    """
+    Recursively collects notebook files (`.ipynb`) below a directory in a single pass.
+
+    Hidden files and directories (i.e., starting with a dot) are skipped, hidden directories are not entered at all.
+    Symbolic links to directories are not followed.
+
+    Parameters
+    ----------
+    path : str
+        The directory to search in.
+
+    Returns
+    -------
+    List[str]
+        A list of paths to the notebook files found. The list is empty if the directory does not exist.
+    """
+
+    notebooks = []
+
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    notebooks.extend(find_notebooks(path=entry.path))
+                elif entry.name.endswith('.ipynb') and entry.is_file():
+                    notebooks.append(entry.path)
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
+        pass
+
+    return notebooks
+
+
+def _find_active_courses(base_path: str) -> List[str]:
+    course_path = f'{base_path}/course_data'
+    return [course_path] if os.path.isdir(course_path) else []
+
+
+def _find_active_assignments(base_path: str) -> List[str]:
+    return [
+        str(path)
+        for path in Path(f'{base_path}/course_data/source').glob('*/')
+        if path.is_dir() and not path.name.startswith('.')
+    ]
+
+
+def _find_active_problems(base_path: str) -> List[str]:
+    return find_notebooks(path=f'{base_path}/course_data/source')
+
+
+def _find_backed_up_courses(base_dir: Path) -> List[str]:
+    return [
+        str(path).removesuffix('/')
+        for path in base_dir.glob('*/')
+        if path.is_dir() and not path.name.startswith('.')
+    ]
+
+
+def _find_backed_up_assignments(base_dir: Path) -> List[str]:
+    return [
+        str(assignment_path)
+        for source_path in base_dir.glob('*/source/')
+        if source_path.is_dir() and not source_path.parent.name.startswith('.')
+        for assignment_path in source_path.glob('*/')
+        if assignment_path.is_dir() and not assignment_path.name.startswith('.')
+    ]
+
+
+def _find_backed_up_problems(base_dir: Path) -> List[str]:
+    return [
+        problem_path
+        for source_path in base_dir.glob('*/source/')
+        if source_path.is_dir() and not source_path.parent.name.startswith('.')
+        for problem_path in find_notebooks(path=str(source_path))
+    ]
+
+
+# Path finders and name makers by content type. Path finders skip hidden files and directories (i.e., starting with a dot)
+# below the course or backup directory. Name makers get the segments of a path, so each path is split once only.
+_ACTIVE_PATH_FINDERS = {
+    Content.COURSES: _find_active_courses,
+    Content.ASSIGNMENTS: _find_active_assignments,
+    Content.PROBLEMS: _find_active_problems,
+}
+_BACKED_UP_PATH_FINDERS = {
+    Content.COURSES: _find_backed_up_courses,
+    Content.ASSIGNMENTS: _find_backed_up_assignments,
+    Content.PROBLEMS: _find_backed_up_problems,
+}
+_ACTIVE_NAME_MAKERS = {
+    Content.COURSES: lambda parts, title_short: title_short,
+    Content.ASSIGNMENTS: lambda parts, title_short: f"{parts[-1]} ({title_short})",
+    Content.PROBLEMS: lambda parts, title_short: f"{parts[-1].removesuffix('.ipynb')} ({title_short}, {parts[-2]})",
+}
+_BACKED_UP_NAME_MAKERS = {
+    Content.COURSES: lambda parts: f"{parts[-1]} (Backup)",
+    Content.ASSIGNMENTS: lambda parts: f"{parts[-1]} (Backup, {parts[-3]})",
+    Content.PROBLEMS: lambda parts: f"{parts[-1].removesuffix('.ipynb')} (Backup, {parts[-4]}, {parts[-2]})",
+}
+
+
 def get_active_paths(user_name: str, groups: dict, content: Content, subset: Subset) -> List[str]:
     """
     Retrieves active paths based on the content type within specified base paths.
@@ -274,43 +768,31 @@ def get_active_paths(user_name: str, groups: dict, content: Content, subset: Sub
     # Generating the Subset.ACTIVE course list.
     if subset == Subset.ALL or subset == Subset.ACTIVE:
         owned_groups = [
-            group.lstrip('formgrade-')
-            for group in groups
-            if user_name in groups.get(group)
+            group.removeprefix('formgrade-')
+            for group, members in groups.items()
+            if user_name in members
         ]
+        group_names = {group.gr_gid: group.gr_name for group in grp.getgrall()}
         base_paths = [
             item.path.removesuffix('/')
             for item in os.scandir('/home')
-            if item.is_dir() and grp.getgrgid(os.stat(item.path).st_gid)[0] in owned_groups
+            if item.is_dir() and group_names.get(item.stat().st_gid) in owned_groups
         ]
         logging.debug(f'Owned groups: {owned_groups}')
         logging.debug(f'Base paths: {base_paths}')
 
-        active_paths = []
-
-        for base_path in base_paths:
-            paths = []
-
-            if content == Content.COURSES:
-                specific_path = Path(f'{base_path}/course_data/')
-                if specific_path.exists():
-                    paths = [specific_path / '']
-            elif content == Content.ASSIGNMENTS:
-                specific_path = Path(f'{base_path}/course_data/source/')
-                if specific_path.exists():
-                    paths = specific_path.glob('*/')
-            elif content == Content.PROBLEMS:
-                specific_path = Path(f'{base_path}/course_data/source/')
-                if specific_path.exists():
-                    paths = specific_path.rglob('*.ipynb')
-            else:
-                raise ValueError(f"Invalid content type: {content}")
-
-            active_paths.extend(
-                str(path) for path in paths
-                if path.is_dir() or (content == Content.PROBLEMS and path.is_file())
-                and not any(part.name.startswith('.') for part in path.parents)
-            )
+        try:
+            find_active_paths = _ACTIVE_PATH_FINDERS[content]
+        except KeyError:
+            raise ValueError(f"Invalid content type: {content}")
+
+        # Scanning the course directories for assignments or problems is I/O bound, so several courses are scanned in
+        # parallel. Courses are found with a single check per base path, which is cheaper than starting threads.
+        if content != Content.COURSES and len(base_paths) > 1:
+            with ThreadPoolExecutor(max_workers=min(8, len(base_paths))) as executor:
+                active_paths = [path for paths in executor.map(find_active_paths, base_paths) for path in paths]
+        else:
+            active_paths = [path for base_path in base_paths for path in find_active_paths(base_path)]
 
         return sorted(active_paths)
 
@@ -319,8 +801,7 @@ def get_active_paths(user_name: str, groups: dict, content: Content, subset: Sub
         lti_file_path = f'/opt/kore/runtime/lti_{user_name}.json'
 
         try:
-            with open(lti_file_path, 'r') as lti_file:
-                lti_state = json.load(lti_file)
+            lti_state = load_json_cached(path=lti_file_path)
             _, _, _, grader_user = make_course_id(lti_state=lti_state)
             return [f'/home/{grader_user}/course_data']
         except (FileNotFoundError, PermissionError, OSError):
@@ -350,34 +831,48 @@ def get_backed_up_paths(user_name: str, content: Content) -> List[str]:
         that are hidden (i.e., starting with a dot) or are within hidden parent directories.
     """
 
-    base_dir = Path(f'/var/lib/private/{user_name}')
-
-    if content == Content.COURSES:
-        backed_up_paths = [
-            str(path).removesuffix('/')
-            for path in base_dir.glob('*/')
-            if path.is_dir() and not any(part.name.startswith('.') for part in path.parents) and not path.name.startswith('.')
-        ]
-    elif content == Content.ASSIGNMENTS:
-        backed_up_paths = [
-            str(assignment_path)
-            for source_path in base_dir.glob('*/source/')
-            if source_path.is_dir()
-            for assignment_path in source_path.glob('*/')
-            if assignment_path.is_dir() and not assignment_path.name.startswith('.')
-        ]
-    elif content == Content.PROBLEMS:
-        backed_up_paths = [
-            str(problem_path)
-            for source_path in base_dir.glob('*/source/')
-            if source_path.is_dir()
-            for problem_path in source_path.rglob('*.ipynb')
-            if problem_path.is_file() and not any(part.name.startswith('.') for part in problem_path.parents)
-        ]
-    else:
+    try:
+        find_backed_up_paths = _BACKED_UP_PATH_FINDERS[content]
+    except KeyError:
         raise ValueError(f'Invalid content type: {content}. Must be `Content.COURSES`, `Content.ASSIGNMENTS`, or `Content.PROBLEMS`.')
 
-    return sorted(backed_up_paths)
+    return sorted(find_backed_up_paths(Path(f'/var/lib/private/{user_name}')))
+
+
+def make_list_etag(autogenerated_file_path: str, user_name: str, subset: Subset) -> str:
+    """
+    Makes an entity tag for a user's course list. The tag is derived from the modification times of the files and
+    directories the list is generated from: the autogenerated configuration (group memberships), `/home` (grader home
+    directories) and, for `Subset.ALL`, the user's backup directory.
+
+    Parameters
+    ----------
+    autogenerated_file_path : str
+        The path to the autogenerated configuration file containing user group information.
+    user_name : str
+        The user the list is generated for.
+    subset : Subset
+        The subset of courses listed.
+
+    Returns
+    -------
+    str
+        The entity tag (without quotes).
+    """
+
+    paths = [f'{autogenerated_file_path}.json', autogenerated_file_path, '/home']
+    if subset == Subset.ALL:
+        paths.append(f'/var/lib/private/{user_name}')
+
+    key = [user_name, subset.value]
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            key.append(f'{stat.st_mtime_ns}-{stat.st_size}')
+        except OSError:
+            key.append('-')
+
+    return hashlib.sha1('/'.join(map(str, key)).encode()).hexdigest()
 
 
 def get_list(autogenerated_file_path: str, content: Content, subset: Subset = Subset.ALL) -> Response:
@@ -406,28 +901,39 @@ def get_list(autogenerated_file_path: str, content: Content, subset: Subset = Su
     try:
         user_name = flask_request.args.get('user')
     except BadRequestKeyError:
-        return Response(response=json.dumps({'message': 'BadRequestKeyError'}), status=500)
+        return Response(response=dump_json({'message': 'BadRequestKeyError'}), status=500)
+
+    # Course lists are polled, so clients are told to revalidate them with an entity tag. Unchanged lists are not
+    # generated again.
+    etag = None
+    if content == Content.COURSES and (subset == Subset.ALL or subset == Subset.ACTIVE):
+        etag = make_list_etag(autogenerated_file_path=autogenerated_file_path, user_name=user_name, subset=subset)
+        if flask_request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
 
     # Access list of 'owned' groups, this is necessary to copy assignments stored at '/home/FORMGRADER_USER' and verifying access rights.
     try:
         _, _, groups = read_autogenerated_config(autogenerated_file_path=autogenerated_file_path)
     except AutogeneratedFileError:
-        return Response(response=json.dumps({'message': 'AutogeneratedFileError'}), status=500)
+        return Response(response=dump_json({'message': 'AutogeneratedFileError'}), status=500)
 
     try:
         active_paths = get_active_paths(user_name=user_name, groups=groups, content=content, subset=subset)
     except ActivePathsError:
-        return Response(response=json.dumps({'message': 'ActivePathsError'}), status=500)
+        return Response(response=dump_json({'message': 'ActivePathsError'}), status=500)
 
     # Exit early if there are no active courses.
     if not active_paths:
-        return Response(response=json.dumps({'message': 'NoActiveCoursesFoundError'}), status=500)
+        return Response(response=dump_json({'message': 'NoActiveCoursesFoundError'}), status=500)
 
     if subset == Subset.ACTIVE or subset == Subset.CURRENT:
         try:
             unique_names = generate_unique_names(content=content, active_paths=active_paths)
         except UniqueNamesError:
-            return Response(response=json.dumps({'message': 'UniqueNamesError'}), status=500)
+            return Response(response=dump_json({'message': 'UniqueNamesError'}), status=500)
 
         content_list = {
             'message': f'List of {content.value} successfully retrieved.',
@@ -435,7 +941,12 @@ def get_list(autogenerated_file_path: str, content: Content, subset: Subset = Su
             'paths': active_paths
         }
 
-        return Response(response=json.dumps(content_list), status=200)
+        response = Response(response=dump_json(content_list), status=200, mimetype='application/json')
+        if etag:
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+
+        return response
 
     if subset == Subset.ALL:
         backed_up_paths = get_backed_up_paths(user_name=user_name, content=content)
@@ -444,7 +955,7 @@ def get_list(autogenerated_file_path: str, content: Content, subset: Subset = Su
         try:
             unique_names = generate_unique_names(content=content, active_paths=active_paths, backed_up_paths=backed_up_paths)
         except UniqueNamesError:
-            return Response(response=json.dumps({'message': 'UniqueNamesError'}), status=500)
+            return Response(response=dump_json({'message': 'UniqueNamesError'}), status=500)
 
         content_list = {
             'message': f'List of {content.value} successfully retrieved.',
@@ -453,7 +964,12 @@ def get_list(autogenerated_file_path: str, content: Content, subset: Subset = Su
         }
         logging.info(f'Generated {content.value} list: {content_list}')
 
-        return Response(response=json.dumps(content_list), status=200)
+        response = Response(response=dump_json(content_list), status=200, mimetype='application/json')
+        if etag:
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+
+        return response
 
 
 def generate_unique_names(content: Content, active_paths: List[str], backed_up_paths: Optional[List[str]] = None) -> List[str]:
@@ -480,34 +996,28 @@ def generate_unique_names(content: Content, active_paths: List[str], backed_up_p
         are ensured to be unique, with duplicates being distinguished by appending counts.
     """
 
+    # Short course titles by grader user, so each course's `info.json` is read once only.
+    titles_short = {}
+
+    try:
+        make_active_name = _ACTIVE_NAME_MAKERS[content]
+        make_backed_up_name = _BACKED_UP_NAME_MAKERS[content]
+    except KeyError:
+        raise ValueError(f'Invalid content type: {content}. Must be `Content.COURSES`, `Content.ASSIGNMENTS`, or `Content.PROBLEMS`.')
+
     active_names = []
     for active_path in active_paths:
-        user_name = active_path.split('/')[2]
-        info_file_path = f'/home/{user_name}/course_data/info.json'
+        parts = active_path.removesuffix('/').split('/')
+        user_name = parts[2]
         try:
-            info = load_info(info_file_path)
-            title_short = info['title_short']
-            if content == Content.COURSES:
-                active_names.append(title_short)
-            elif content == Content.ASSIGNMENTS:
-                active_names.append(f"{active_path.removesuffix('/').split('/')[-1]} ({title_short})")
-            elif content == Content.PROBLEMS:
-                active_names.append(f"{active_path.removesuffix('.ipynb').split('/')[-1]} ({title_short}, {active_path.removesuffix('/').split('/')[-2]})")
-            else:
-                raise ValueError(f'Invalid content type: {content}. Must be `Content.COURSES`, `Content.ASSIGNMENTS`, or `Content.PROBLEMS`.')
-        except (FileNotFoundError, PermissionError, CalledProcessError, OSError):
+            title_short = titles_short.get(user_name)
+            if title_short is None:
+                title_short = titles_short[user_name] = load_info_cached(f'/home/{user_name}/course_data/info.json')['title_short']
+            active_names.append(make_active_name(parts, title_short))
+        except (FileNotFoundError, PermissionError, CalledProcessError, OSError, KeyError, InfoFileError):
             raise UniqueNamesError
 
-    backed_up_names = []
-    if backed_up_paths:
-        if content == Content.COURSES:
-            backed_up_names = [f"{path.split('/')[-1]} (Backup)" for path in backed_up_paths]
-        elif content == Content.ASSIGNMENTS:
-            backed_up_names = [f"{path.split('/')[-1]} (Backup, {path.split('/')[-3]})" for path in backed_up_paths]
-        elif content == Content.PROBLEMS:
-            backed_up_names = [f"{path.removesuffix('.ipynb').split('/')[-1]} (Backup, {path.split('/')[-4]}, {path.split('/')[-2]})" for path in backed_up_paths]
-        else:
-            raise ValueError(f'Invalid content type: {content}. Must be `Content.COURSES`, `Content.ASSIGNMENTS`, or `Content.PROBLEMS`.')
+    backed_up_names = [make_backed_up_name(path.removesuffix('/').split('/')) for path in backed_up_paths] if backed_up_paths else []
 
     unique_names = []
     for names in [active_names, backed_up_names] if backed_up_paths else [active_names]:
@@ -516,6 +1026,7 @@ def generate_unique_names(content: Content, active_paths: List[str], backed_up_p
             unique_content_names = names
         else:
             seen = set()
+            last_counts = Counter()
             unique_content_names = []
 
             for name in names:
@@ -523,9 +1034,11 @@ def generate_unique_names(content: Content, active_paths: List[str], backed_up_p
                     seen.add(name)
                     unique_content_names.append(name)
                 else:
-                    count = 1
+                    # Continue counting from the last suffix used for this name instead of starting at 1 again.
+                    count = last_counts[name] + 1
                     while f'{name} ({count})' in seen:
                         count += 1
+                    last_counts[name] = count
                     new_name = f'{name} ({count})'
                     seen.add(new_name)
                     unique_content_names.append(new_name)
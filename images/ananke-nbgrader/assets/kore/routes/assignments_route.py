@@ -1,13 +1,12 @@
-import json
 import logging
+import os
 import time
-from subprocess import run, CalledProcessError
 
 from flask import Blueprint, Response, current_app
 from flask import request as flask_request
 
 from exceptions import InfoFileError
-from misc.utils import get_list, load_info
+from misc.utils import get_list, load_info_cached, copy_tree, dump_json, get_user_ids
 from models.enums import Content
 
 assignments_bp = Blueprint('assignments', __name__)
@@ -25,7 +24,7 @@ def assignments():
         try:
             return get_list(autogenerated_file_path=autogenerated_file_path, content=Content.ASSIGNMENTS)
         except ValueError:
-            return Response(response=json.dumps({'message': 'ValueError'}), status=500)
+            return Response(response=dump_json({'message': 'ValueError'}), status=500)
 
     # Copy an assignment.
     if flask_request.method == 'POST':
@@ -34,25 +33,27 @@ def assignments():
             dst = flask_request.json['toPath'].removesuffix('/')
         except KeyError:
             logging.error('Request key is not in form!')
-            return Response(response=json.dumps({'message': 'KeyError'}), status=500)
+            return Response(response=dump_json({'message': 'KeyError'}), status=500)
 
         # Read `info.json` file.
         try:
-            info = load_info(f'{dst}/info.json')
+            info = load_info_cached(f'{dst}/info.json')
             grader_user = info['grader_user']
         except (KeyError, InfoFileError):
-            return Response(response=json.dumps({'message': 'InfoFileError'}), status=500)
+            return Response(response=dump_json({'message': 'InfoFileError'}), status=500)
 
         dst = f'{dst}/source/'
         try:
-            tmp = f'{src}_{time.strftime(date_time_format)}'
-            run(['cp', '-r', src, tmp], check=True)
-            run(['mkdir', '-p', dst], check=True)
-            run(['mv', tmp, dst], check=True)
-            run(['chown', '-R', f'{grader_user}:{grader_user}', dst], check=True)
-        except CalledProcessError:
-            logging.error('Command cannot be executed!')
-            return Response(response=json.dumps({'message': 'CalledProcessError'}), status=500)
-
-        return Response(response=json.dumps({'message': 'Selected assignment copied successfully! \n'
+            uid, gid = get_user_ids(grader_user)
+            os.makedirs(dst, exist_ok=True)
+            os.chown(dst, uid, gid)
+            copy_tree(src=src, dst=f'{dst}{os.path.basename(src)}_{time.strftime(date_time_format)}', uid=uid, gid=gid)
+        except KeyError:
+            logging.error(f'Grader user {grader_user} does not exist!')
+            return Response(response=dump_json({'message': 'KeyError'}), status=500)
+        except OSError:
+            logging.error('Assignment cannot be copied!')
+            return Response(response=dump_json({'message': 'OSError'}), status=500)
+
+        return Response(response=dump_json({'message': 'Selected assignment copied successfully! \n'
                                                         'Please refresh the webpage (Formgrader) to see the imported assignment.'}), status=200)
@@ -1,14 +1,17 @@
+import copy
 import json
 import logging
+import os
+import pwd
+import sys
 import time
-from pathlib import Path
 from subprocess import run, CalledProcessError
 
 from flask import Response, Blueprint, current_app
 from flask import request as flask_request
 
-from exceptions import AutogeneratedFileError, InfoFileError, CleanUpError
-from misc.utils import read_autogenerated_config, write_autogenerated_config, get_list, load_info, handle_clean_up
+from exceptions import AutogeneratedFileError, InfoFileError, CleanUpError, ConfigFileError
+from misc.utils import read_autogenerated_config, write_autogenerated_config, get_list, load_info, handle_clean_up, copy_tree, dump_json, update_course_titles, write_file_atomically, index_by_name, get_user_ids
 from models.enums import Subset, Content
 
 courses_bp = Blueprint('courses', __name__)
@@ -22,11 +25,10 @@ def active_courses():
     config_loader = current_app.config['CONFIG_LOADER']
     autogenerated_file_path = config_loader.autogenerated_file_path
 
-    if flask_request.method == 'GET':
-        try:
-            return get_list(autogenerated_file_path=autogenerated_file_path, content=Content.COURSES, subset=Subset.ACTIVE)
-        except ValueError:
-            return Response(response=json.dumps({'message': 'ValueError'}), status=500)
+    try:
+        return get_list(autogenerated_file_path=autogenerated_file_path, content=Content.COURSES, subset=Subset.ACTIVE)
+    except ValueError:
+        return Response(response=dump_json({'message': 'ValueError'}), status=500)
 
 
 @courses_bp.route('/courses/current', methods=['GET'])
@@ -34,203 +36,213 @@ def current_courses():
     config_loader = current_app.config['CONFIG_LOADER']
     autogenerated_file_path = config_loader.autogenerated_file_path
 
-    if flask_request.method == 'GET':
-        try:
-            return get_list(autogenerated_file_path=autogenerated_file_path, content=Content.COURSES, subset=Subset.CURRENT)
-        except ValueError:
-            return Response(response=json.dumps({'message': 'ValueError'}), status=500)
+    try:
+        return get_list(autogenerated_file_path=autogenerated_file_path, content=Content.COURSES, subset=Subset.CURRENT)
+    except ValueError:
+        return Response(response=dump_json({'message': 'ValueError'}), status=500)
 
 
-@courses_bp.route('/courses', methods=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
-def courses():
+# Retrieve full course list (active and backed up ones).
+@courses_bp.route('/courses', methods=['GET'])
+def courses_get():
     config_loader = current_app.config['CONFIG_LOADER']
-
     autogenerated_file_path = config_loader.autogenerated_file_path
-    date_time_format = config_loader.date_time_format
 
-    kore_token = current_app.config['KORE_TOKEN']
+    try:
+        return get_list(autogenerated_file_path=autogenerated_file_path, content=Content.COURSES)
+    except ValueError:
+        return Response(response=dump_json({'message': 'ValueError'}), status=500)
 
-    # Retrieve full course list (active and backed up ones).
-    if flask_request.method == 'GET':
-        try:
-            return get_list(autogenerated_file_path=autogenerated_file_path, content=Content.COURSES)
-        except ValueError:
-            return Response(response=json.dumps({'message': 'ValueError'}), status=500)
 
-    # Copy a course.
-    if flask_request.method == 'POST':
+# Copy a course.
+@courses_bp.route('/courses', methods=['POST'])
+def courses_post():
+    config_loader = current_app.config['CONFIG_LOADER']
+    date_time_format = config_loader.date_time_format
+
+    try:
+        user_name = flask_request.json['user']
+        src = flask_request.json['fromPath'].removesuffix('/')
+        src = f'{src}/source/'
+        dst = flask_request.json['toPath'].removesuffix('/')
+    except KeyError:
+        return Response(response=dump_json({'message': 'KeyError'}), status=500)
+
+    logging.info(f'User {user_name} is importing a course from {src} to {dst}/source/.')
+
+    # Read `info.json` file.
+    try:
+        info = load_info(f'{dst}/info.json')
+        grader_user = info['grader_user']
+    except (KeyError, InfoFileError):
+        return Response(response=dump_json({'message': 'InfoFileError'}), status=500)
+
+    try:
+        with os.scandir(src) as entries:
+            assignments = [
+                entry for entry in entries
+                if not entry.name.startswith('.') and entry.is_dir()
+            ]
+    except (FileNotFoundError, NotADirectoryError):
+        assignments = []
+    except OSError:
+        return Response(response=dump_json({'message': 'OSError'}), status=500)
+
+    # Copy assignments directly to their final names, owned by the grader user. All copies of one import share the
+    # same timestamp.
+    dst = f'{dst}/source/'
+    if assignments:
+        actual_date_time = time.strftime(date_time_format)
         try:
-            user_name = flask_request.json['user']
-            src = flask_request.json['fromPath'].removesuffix('/')
-            src = Path(f'{src}/source/')
-            dst = flask_request.json['toPath'].removesuffix('/')
+            uid, gid = get_user_ids(grader_user)
+            os.makedirs(dst, exist_ok=True)
+            os.chown(dst, uid, gid)
+            for assignment in assignments:
+                copy_tree(src=assignment.path, dst=f'{dst}{assignment.name}_{actual_date_time}', uid=uid, gid=gid)
         except KeyError:
-            return Response(response=json.dumps({'message': 'KeyError'}), status=500)
+            return Response(response=dump_json({'message': 'KeyError'}), status=500)
+        except OSError:
+            return Response(response=dump_json({'message': 'OSError'}), status=500)
 
-        logging.info(f'User {user_name} is importing a course from {src} to {dst}/source/.')
+    return Response(response=dump_json({'message': 'Selected course copied successfully! \n'
+                                                    'Please refresh the webpage (Formgrader) to see the imported course.'}), status=200)
 
-        # Read `info.json` file.
-        try:
-            info = load_info(f'{dst}/info.json')
-            grader_user = info['grader_user']
-        except (KeyError, InfoFileError):
-            return Response(response=json.dumps({'message': 'InfoFileError'}), status=500)
-
-        assignments = [
-            assignment for assignment in src.iterdir()
-            if assignment.is_dir() and not assignment.name.startswith('.')
-        ] if src.is_dir() else []
-
-        dst = f'{dst}/source/'
-        for assignment in assignments:
-            try:
-                tmp = f'{assignment}_{time.strftime(date_time_format)}'
-                run(['cp', '-r', assignment, tmp], check=True)
-                run(['mkdir', '-p', dst], check=True)
-                if Path(tmp).parent != Path(dst):
-                    run(['mv', tmp, dst], check=True)
-                run(['chown', '-R', f'{grader_user}:{grader_user}', dst], check=True)
-            except CalledProcessError:
-                return Response(response=json.dumps({'message': 'CalledProcessError'}), status=500)
-
-        return Response(response=json.dumps({'message': 'Selected course copied successfully! \n'
-                                                        'Please refresh the webpage (Formgrader) to see the imported course.'}), status=200)
-
-    # Backup a course.
-    if flask_request.method == 'PUT':
-        try:
-            user_name = flask_request.json['user']
-            src = flask_request.json['path'].removesuffix('/')
-            name = flask_request.json['name']
-        except KeyError:
-            return Response(response=json.dumps({'message': 'KeyError'}), status=500)
 
-        logging.info(f'User {user_name} is backing up course from {src}.')
+# Backup a course.
+@courses_bp.route('/courses', methods=['PUT'])
+def courses_put():
+    config_loader = current_app.config['CONFIG_LOADER']
+    date_time_format = config_loader.date_time_format
 
-        actual_date_time = time.strftime(date_time_format)
-        dst = f'/var/lib/private/{user_name}/{name}_{actual_date_time}/'
+    try:
+        user_name = flask_request.json['user']
+        src = flask_request.json['path'].removesuffix('/')
+        name = flask_request.json['name']
+    except KeyError:
+        return Response(response=dump_json({'message': 'KeyError'}), status=500)
 
-        try:
-            run(['cp', '-r', src, dst], check=True)
-            run(['rm', f'{dst}info.json'], check=True)
-            run(['chown', '-R', f'{user_name}:{user_name}', dst], check=True)
-        except CalledProcessError:
-            return Response(response=json.dumps({'message': 'CalledProcessError'}), status=500)
+    logging.info(f'User {user_name} is backing up course from {src}.')
 
-        return Response(response=json.dumps({'message': 'Selected course backed up successfully!'}), status=200)
+    actual_date_time = time.strftime(date_time_format)
+    dst = f'/var/lib/private/{user_name}/{name}_{actual_date_time}/'
 
-    # Reset a course.
-    if flask_request.method == 'PATCH':
-        try:
-            user_name = flask_request.json['user']
-            path = flask_request.json['path'].removesuffix('/')
-        except KeyError:
-            return Response(response=json.dumps({'message': 'KeyError'}), status=500)
+    try:
+        # Hub users are dynamic users, whose IDs may change, so they are not looked up through the cache.
+        user = pwd.getpwnam(user_name)
+        copy_tree(src=src, dst=dst, uid=user.pw_uid, gid=user.pw_gid)
+        os.remove(f'{dst}info.json')
+    except KeyError:
+        return Response(response=dump_json({'message': 'KeyError'}), status=500)
+    except OSError:
+        return Response(response=dump_json({'message': 'OSError'}), status=500)
 
-        logging.info(f'User {user_name} is resetting course at {path}.')
+    return Response(response=dump_json({'message': 'Selected course backed up successfully!'}), status=200)
 
-        # Read `info.json` file.
-        try:
-            info = load_info(f'{path}/info.json')
-            course_id = info['id']
-            base_url = info['target_link_uri']
-        except (KeyError, InfoFileError):
-            return Response(response=json.dumps({'message': 'InfoFileError'}), status=500)
 
-        # Clean up gradebook, course directories and files.
-        try:
-            handle_clean_up(path=path, kore_token=kore_token, base_url=base_url, course_id=course_id)
-        except CleanUpError:
-            return Response(response=json.dumps({'message': 'CleanUpError'}), status=500)
+# Reset a course.
+@courses_bp.route('/courses', methods=['PATCH'])
+def courses_patch():
+    kore_token = current_app.config['KORE_TOKEN']
 
-        return Response(response=json.dumps({'message': 'Selected course reset successfully!'}), status=200)
+    try:
+        user_name = flask_request.json['user']
+        path = flask_request.json['path'].removesuffix('/')
+    except KeyError:
+        return Response(response=dump_json({'message': 'KeyError'}), status=500)
 
-    # Delete a course.
-    if flask_request.method == 'DELETE':
-        try:
-            user_name = flask_request.json['user']
-            path = flask_request.json['path'].removesuffix('/')
-        except KeyError:
-            return Response(response=json.dumps({'message': 'KeyError'}), status=500)
+    logging.info(f'User {user_name} is resetting course at {path}.')
 
-        logging.info(f'User {user_name} is deleting course at {path}.')
+    # Read `info.json` file.
+    try:
+        info = load_info(f'{path}/info.json')
+        course_id = info['id']
+        base_url = info['target_link_uri']
+    except (KeyError, InfoFileError):
+        return Response(response=dump_json({'message': 'InfoFileError'}), status=500)
 
-        # Read `info.json` file.
-        try:
-            info = load_info(f'{path}/info.json')
-            course_id = info['id']
-            grader_user = info['grader_user']
-        except (KeyError, InfoFileError):
-            return Response(response=json.dumps({'message': 'InfoFileError'}), status=500)
+    # Clean up gradebook, course directories and files.
+    try:
+        handle_clean_up(path=path, kore_token=kore_token, base_url=base_url, course_id=course_id)
+    except CleanUpError:
+        return Response(response=dump_json({'message': 'CleanUpError'}), status=500)
 
-        # Get user's courses and corresponding information.
-        try:
-            services, roles, groups = read_autogenerated_config(autogenerated_file_path=autogenerated_file_path)
-        except AutogeneratedFileError:
-            return Response(response=json.dumps({'message': 'AutogeneratedFileError'}), status=500)
-
-        # Access group and delete it from groups list.
-        group = groups.get(f'formgrade-{course_id}')
-        if not group:
-            return Response(response=json.dumps({'message': 'GroupNotFoundError'}), status=500)
-
-        del groups[f'formgrade-{course_id}']
-
-        # Delete roles from roles lists.
-        for role in roles:
-            if role.get('name') == f'formgrader-{course_id}-role':
-                del roles[roles.index(role)]
-            if role.get('name') == 'formgrader-service-role':
-                del role['services'][role['services'].index(course_id)]
-
-        # Delete services from services list.
-        for service in services:
-            if service['name'] == course_id:
-                del services[services.index(service)]
-                break
-
-        # Write resulting configuration file.
-        try:
-            write_autogenerated_config(autogenerated_file_path=autogenerated_file_path, services=services, roles=roles, groups=groups)
-        except AutogeneratedFileError:
-            return Response(response=json.dumps({'message': 'AutogeneratedFileError'}), status=500)
+    return Response(response=dump_json({'message': 'Selected course reset successfully!'}), status=200)
 
-        # Delete nbgrader exchange directory for course.
-        try:
-            run(['rm', '-rf', f'/opt/nbgrader_exchange/{course_id}/'], check=True)
-        except CalledProcessError:
-            return Response(response=json.dumps({'message': 'CalledProcessError'}), status=500)
 
-        # Delete grader user for course.
-        try:
-            run(['userdel', f'{grader_user}'], check=True)
-            run(['rm', '-rf', f'/home/{grader_user}/'], check=True)
-        except CalledProcessError:
-            return Response(response=json.dumps({'message': 'CalledProcessError'}), status=500)
-
-        # Generate new nbgrader configuration code and write it to file.
-        with open(file='/opt/conda/envs/jhub/etc/jupyter/nbgrader_config.py') as nb_grader_config:
-            content = nb_grader_config.read()
-        start = content.find('c.NbGrader.course_titles')
-        end = content.find('}', start)
-        pre = content[:start]
-        code = content[start:end + 1]
-        post = content[end + 1:]
-        code = code.replace('c.NbGrader.course_titles = ', 'mapping.update(')
-        code = code.replace('}', '})')
-        mapping = {}
-        exec(code + '\n')
-
-        if course_id in mapping.keys():
-            del mapping[course_id]
-
-        with open(file='/opt/conda/envs/jhub/etc/jupyter/nbgrader_config.py', mode='w') as nb_grader_config:
-            nb_grader_config.write(pre)
-            nb_grader_config.write(f'c.NbGrader.course_titles = {str(mapping)}')
-            nb_grader_config.write(post)
-
-        # Restart JupyterHub to adopt the changes.
-        logging.info('Restarting JupyterHub in 3 seconds...')
-        run(['systemd-run', '--on-active=3', 'systemctl', 'restart', 'jupyterhub'])
-
-        return Response(response=json.dumps({'message': 'Selected course deleted successfully! JupyterHub will restart soon!'}), status=200)
+# Delete a course.
+@courses_bp.route('/courses', methods=['DELETE'])
+def courses_delete():
+    config_loader = current_app.config['CONFIG_LOADER']
+    autogenerated_file_path = config_loader.autogenerated_file_path
+
+    try:
+        user_name = flask_request.json['user']
+        path = flask_request.json['path'].removesuffix('/')
+    except KeyError:
+        return Response(response=dump_json({'message': 'KeyError'}), status=500)
+
+    logging.info(f'User {user_name} is deleting course at {path}.')
+
+    # Read `info.json` file.
+    try:
+        info = load_info(f'{path}/info.json')
+        course_id = info['id']
+        grader_user = info['grader_user']
+    except (KeyError, InfoFileError):
+        return Response(response=dump_json({'message': 'InfoFileError'}), status=500)
+
+    # Get user's courses and corresponding information. The configuration is modified below, so the cached one is copied.
+    try:
+        services, roles, groups = copy.deepcopy(read_autogenerated_config(autogenerated_file_path=autogenerated_file_path))
+    except AutogeneratedFileError:
+        return Response(response=dump_json({'message': 'AutogeneratedFileError'}), status=500)
+
+    # Access group and delete it from groups list.
+    group = groups.get(f'formgrade-{course_id}')
+    if not group:
+        return Response(response=dump_json({'message': 'GroupNotFoundError'}), status=500)
+
+    del groups[f'formgrade-{course_id}']
+
+    # Delete roles from roles list.
+    roles_by_name = index_by_name(roles)
+    roles_by_name.pop(f'formgrader-{course_id}-role', None)
+    service_role = roles_by_name.get('formgrader-service-role')
+    if service_role and course_id in service_role['services']:
+        service_role['services'].remove(course_id)
+    roles = list(roles_by_name.values())
+
+    # Delete service from services list.
+    services_by_name = index_by_name(services)
+    services_by_name.pop(course_id, None)
+    services = list(services_by_name.values())
+
+    # Write resulting configuration file.
+    try:
+        write_autogenerated_config(autogenerated_file_path=autogenerated_file_path, services=services, roles=roles, groups=groups)
+    except AutogeneratedFileError:
+        return Response(response=dump_json({'message': 'AutogeneratedFileError'}), status=500)
+
+    # Remove course title from global nbgrader configuration file.
+    try:
+        update_course_titles(nbgrader_config_path=config_loader.nbgrader_config_path, course_id=course_id)
+    except ConfigFileError:
+        return Response(response=dump_json({'message': 'ConfigFileError'}), status=500)
+
+    # Delete exchange directory, grader user and home directory in the background. JupyterHub is stopped while they
+    # are deleted and started again afterwards to adopt the changes. Each deletion gets its own job file and unit, and the unit
+    # is unloaded even if it fails, so earlier deletions of the same course cannot interfere with this one.
+    job_id = f'{course_id}-{time.time_ns()}'
+    job_path = f'/opt/kore/runtime/jobs/delete_{job_id}.json'
+    try:
+        os.makedirs(os.path.dirname(job_path), mode=0o700, exist_ok=True)
+        write_file_atomically(path=job_path, content=json.dumps({'course_id': course_id, 'grader_user': grader_user}))
+        run(['systemd-run', f'--unit=kore-delete-{job_id}', '--collect', '--working-directory=/opt/kore', sys.executable, '-m', 'misc.delete_worker', job_path], check=True)
+    except OSError:
+        return Response(response=dump_json({'message': 'OSError'}), status=500)
+    except CalledProcessError:
+        return Response(response=dump_json({'message': 'CalledProcessError'}), status=500)
+
+    logging.info(f'Deletion of course {course_id} scheduled.')
+
+    return Response(response=dump_json({'message': 'Selected course deleted successfully! JupyterHub will restart soon!'}), status=202)
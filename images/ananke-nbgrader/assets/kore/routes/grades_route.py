@@ -14,7 +14,7 @@ from requests.exceptions import ConnectionError, HTTPError, RequestException
 from urllib3.exceptions import LocationParseError
 
 from exceptions import InfoFileError
-from misc.utils import load_info
+from misc.utils import load_info, dump_json, hub_session
 
 grades_bp = Blueprint('grades', __name__)
 
@@ -31,7 +31,7 @@ def grades():
             user_name = flask_request.json['user']
             path = flask_request.json['path'].removesuffix('/')
         except KeyError:
-            return Response(response=json.dumps({'message': 'KeyError'}), status=500)
+            return Response(response=dump_json({'message': 'KeyError'}), status=500)
 
         logging.info(f'User {user_name} indents to send grades of course at {path}.')
 
@@ -43,24 +43,18 @@ def grades():
             lineitem = info['lineitem']
             grader_user = info['grader_user']
         except (KeyError, InfoFileError):
-            return Response(response=json.dumps({'message': 'InfoFileError'}), status=500)
+            return Response(response=dump_json({'message': 'InfoFileError'}), status=500)
 
         # Get admin state.
-        headers = {
-            'Content-Type': 'application/json',
-            'Accept': 'application/json',
-            'Authorization': f'token {kore_token}',
-        }
-
         try:
-            response = requests.get(url=f'http://127.0.0.1:8081/{base_url}hub/api/users/{user_name}', headers=headers)
+            response = hub_session.get(url=f'http://127.0.0.1:8081/{base_url}hub/api/users/{user_name}', headers={'Authorization': f'token {kore_token}'})
             response.raise_for_status()
             user_data = response.json()
             admin = user_data['admin']
             logging.debug(f'{user_name} is admin: {admin}')
         except (HTTPError, LocationParseError, JSONDecodeError):
             logging.error(f'Error while trying to access admin state of user {user_name}!')
-            return Response(response=json.dumps({'message': 'AdminStateError'}), status=500)
+            return Response(response=dump_json({'message': 'AdminStateError'}), status=500)
 
         # Create token for requesting access token from LMS.
         try:
@@ -73,7 +67,7 @@ def grades():
             }
         except KeyError:
             logging.error('At least one key not found in LTI configuration or LTI state file!')
-            return Response(response=json.dumps({'message': 'TokenCreationError'}), status=500)
+            return Response(response=dump_json({'message': 'TokenCreationError'}), status=500)
 
         # Read the private key of Kore.
         private_key_path = 'keys/lti_key'
@@ -82,7 +76,7 @@ def grades():
                 private_key = private_key.read()
         except (FileNotFoundError, PermissionError, OSError):
             logging.error('Error while handling private key!')
-            return Response(response=json.dumps({'message': 'PrivateKeyError'}), status=500)
+            return Response(response=dump_json({'message': 'PrivateKeyError'}), status=500)
 
         # Read the public key of Kore.
         public_key_path = 'keys/lti_key.json'
@@ -91,7 +85,7 @@ def grades():
                 jwk = json.load(public_key)
         except (FileNotFoundError, PermissionError, OSError, JSONDecodeError):
             logging.error('Error while handling public key!')
-            return Response(response=json.dumps({'message': 'PublicKeyError'}), status=500)
+            return Response(response=dump_json({'message': 'PublicKeyError'}), status=500)
 
         token = jwt.encode(auth_token_request_data, private_key, algorithm='RS256', headers={'kid': jwk['kid']})
         params = {
@@ -108,7 +102,7 @@ def grades():
             access_token = response.json()['access_token']
         except (KeyError, HTTPError, LocationParseError, JSONDecodeError):
             logging.error('Error while accessing token.')
-            return Response(response=json.dumps({'message': 'AccessTokenError'}), status=500)
+            return Response(response=dump_json({'message': 'AccessTokenError'}), status=500)
 
         # Get score URL from line items.
         try:
@@ -116,17 +110,18 @@ def grades():
             score_url = url + '/scores?' + args
         except (ValueError, AttributeError):
             logging.error('Error while composing url for score sending!')
-            return Response(response=json.dumps({'message': 'LineitemError'}), status=500)
+            return Response(response=dump_json({'message': 'LineitemError'}), status=500)
 
         # Get parameters from gradebook.
         student_ids, scores, max_scores = [], [], []
 
         # Due to the fact that the gradebook.db would be created while trying to access it with the Gradebook() code line we have to check here if it exists
-        if not os.path.isfile(f'/home/{grader_user}/course_data/gradebook.db'):
+        gradebook_path = f'/home/{grader_user}/course_data/gradebook.db'
+        if not os.path.isfile(gradebook_path):
             logging.error('Gradebook does not exist!')
-            return Response(response=json.dumps({'message': 'GradebookNotExistentError'}), status=500)
+            return Response(response=dump_json({'message': 'GradebookNotExistentError'}), status=500)
 
-        with Gradebook(f'sqlite:////home/{grader_user}/course_data/gradebook.db') as gb:
+        with Gradebook(f'sqlite:///{gradebook_path}') as gb:
             for student in gb.students:
                 student_ids.append(student.lms_user_id)
                 scores.append(student.score)
@@ -159,6 +154,6 @@ def grades():
                     logging.debug(f'Score(s) for student with ID {student_id} successfully send!')
             except (HTTPError, ConnectionError, RequestException):
                 logging.error('Error while trying to send grades to LMS')
-                return Response(response=json.dumps({'message': 'SendGradesError'}), status=500)
+                return Response(response=dump_json({'message': 'SendGradesError'}), status=500)
 
-        return Response(response=json.dumps({'message': 'Grades send successfully!'}), status=200)
+        return Response(response=dump_json({'message': 'Grades send successfully!'}), status=200)
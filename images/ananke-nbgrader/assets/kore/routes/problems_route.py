@@ -1,14 +1,14 @@
-import json
 import logging
+import os
+import shutil
 import time
 from pathlib import Path
-from subprocess import run, CalledProcessError
 
 from flask import Blueprint, Response, current_app
 from flask import request as flask_request
 
 from exceptions import InfoFileError
-from misc.utils import get_list, load_info
+from misc.utils import get_list, load_info_cached, dump_json, get_user_ids
 from models.enums import Content
 
 problems_bp = Blueprint('problems', __name__)
@@ -26,7 +26,7 @@ def problems():
         try:
             return get_list(autogenerated_file_path=autogenerated_file_path, content=Content.PROBLEMS)
         except ValueError:
-            return Response(response=json.dumps({'message': 'ValueError'}), status=500)
+            return Response(response=dump_json({'message': 'ValueError'}), status=500)
 
     # Copy a problem.
     if flask_request.method == 'POST':
@@ -35,23 +35,27 @@ def problems():
             dst = flask_request.json['toPath'].removesuffix('/')
         except KeyError:
             logging.error('Request key is not in form!')
-            return Response(response=json.dumps({'message': 'KeyError'}), status=500)
+            return Response(response=dump_json({'message': 'KeyError'}), status=500)
 
         # Read `info.json` file.
         try:
-            info = load_info(f'{dst}/info.json')
+            info = load_info_cached(f'{dst}/info.json')
             grader_user = info['grader_user']
         except (KeyError, InfoFileError):
-            return Response(response=json.dumps({'message': 'InfoFileError'}), status=500)
+            return Response(response=dump_json({'message': 'InfoFileError'}), status=500)
 
         dst = f'{dst}/source/imported/'
         filename = f'{Path(src).stem}_{time.strftime(date_time_format)}{Path(src).suffix}'
         try:
-            run(['mkdir', '-p', dst], check=True)
-            run(['cp', src, f'{dst}{filename}'], check=True)
-            run(['chown', '-R', f'{grader_user}:{grader_user}', f'{dst}'], check=True)
-        except CalledProcessError:
-            return Response(response=json.dumps({'message': 'CalledProcessError'}), status=500)
+            uid, gid = get_user_ids(grader_user)
+            os.makedirs(dst, exist_ok=True)
+            os.chown(dst, uid, gid)
+            shutil.copy2(src, f'{dst}{filename}')
+            os.chown(f'{dst}{filename}', uid, gid)
+        except KeyError:
+            return Response(response=dump_json({'message': 'KeyError'}), status=500)
+        except OSError:
+            return Response(response=dump_json({'message': 'OSError'}), status=500)
 
-        return Response(response=json.dumps({'message': 'Selected problem copied successfully! \n'
+        return Response(response=dump_json({'message': 'Selected problem copied successfully! \n'
                                                         'Please refresh the webpage (Formgrader) to see the imported problem.'}), status=200)
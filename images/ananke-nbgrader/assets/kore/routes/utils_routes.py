@@ -9,7 +9,7 @@ from flask import session as flask_session
 from jupyterhub.services.auth import HubOAuth
 
 from exceptions import ConfigFileError
-from misc.utils import load_config
+from misc.utils import load_config, dump_json
 
 utils_bp = Blueprint('utils', __name__)
 
@@ -20,9 +20,9 @@ def config():
     if flask_request.method == 'GET':
         try:
             config_data = load_config(path='/opt/kore/config/config.json')
-            return Response(response=json.dumps(config_data), status=200)
+            return Response(response=dump_json(config_data), status=200)
         except ConfigFileError:
-            return Response(response=json.dumps({'message': 'ConfigFileError'}), status=500)
+            return Response(response=dump_json({'message': 'ConfigFileError'}), status=500)
 
 
 @utils_bp.route('/oauth_callback')
@@ -1,3 +1,6 @@
+import json
+import os
+
 from nbgrader.auth import JupyterHubAuthPlugin
 
 c = get_config()  # noqa
@@ -7,5 +10,9 @@ c.Authenticator.plugin_class = JupyterHubAuthPlugin
 c.Exchange.root = '/opt/nbgrader_exchange'
 c.NbGrader.logfile = '/opt/conda/envs/jhub/share/jupyter/nbgrader.log'
 
-# Course ID to course title mapping (autogenerated, do not modify).
-c.NbGrader.course_titles = {}
+# Course ID to course title mapping (written by Kore to `course_titles.json` next to this file).
+try:
+    with open(os.path.join(os.path.dirname(__file__), 'course_titles.json')) as course_titles_file:
+        c.NbGrader.course_titles = json.load(course_titles_file)
+except (OSError, ValueError):
+    c.NbGrader.course_titles = {}